@@ -10,6 +10,7 @@ from mlx.utils import tree_flatten, tree_unflatten
 from .tokenizer import Tokenizer
 import sillm.models as models
 import sillm.models.args as args
+from sillm.models.base import KVCache
 from sillm.training.dataset import Dataset
 
 logger = logging.getLogger("sillm")
@@ -98,6 +99,7 @@ class LLM():
             weights: Weights to update.
         """
         # Update weights
+        weights = self.model.preprocess_weights(weights)
         weights = tree_unflatten(list(weights.items()))
         self.model.update(weights)
         mx.eval(self.model.parameters())
@@ -151,6 +153,7 @@ class LLM():
             weights_path: Path to weights file.
         """
         state = dict(tree_flatten(self.model.parameters()))
+        state = self.model.postprocess_weights(state)
         mx.save_safetensors(weights_path, state)
 
         logger.info(f"Saved model weights to {weights_path}")
@@ -167,6 +170,7 @@ class LLM():
         weights_path = pathlib.Path(weights_path)
 
         state = dict(tree_flatten(self.model.parameters()))
+        state = self.model.postprocess_weights(state)
 
         shards = []
         weight_map = {}
@@ -423,7 +427,8 @@ def generate(model,
 
     def generate_step(model, inputs):
         y = inputs
-        cache = None
+        # Preallocate per-layer key-value caches
+        cache = [KVCache() for _ in range(model.args.n_layers)]
         while True:
             logits, cache = model(y[None], cache=cache)
             logits = logits[:, -1, :]
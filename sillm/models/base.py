@@ -5,18 +5,132 @@ import mlx.nn as nn
 
 from sillm.models.args import ModelArgs
 
+# Additive causal masks memoized for eager forwards, keyed by sequence length and dtype.
+# Kept outside the module tree so cache mutations never show up in model.state and
+# trigger retraces of compiled step functions.
+_causal_mask_cache = {}
+
+########
+# Based on mlx-examples:
+# https://github.com/ml-explore/mlx-examples/blob/854ad8747a9c703773adf8866602b114f68aa54a/llms/mlx_lm/models/base.py#L11
+########
+class KVCache:
+    """
+    Preallocated key-value cache for a single attention layer.
+    """
+    step = 256
+
+    def __init__(self):
+        self.keys = None
+        self.values = None
+        self.offset = 0
+
+    def update_and_fetch(self,
+                         keys: mx.array,
+                         values: mx.array
+                         ):
+        """
+        Write new keys/values into the preallocated cache and return the filled slices.
+        Args:
+            keys: Key tensor for the current tokens.
+            values: Value tensor for the current tokens.
+        Returns:
+            Cached keys and values up to the current offset.
+        """
+        prev = self.offset
+        if self.keys is None or (prev + keys.shape[2]) > self.keys.shape[2]:
+            # Grow the cache in fixed-size steps to amortize allocations
+            B, n_kv_heads, _, head_dim = keys.shape
+            n_steps = (self.step + keys.shape[2] - 1) // self.step
+            k_shape = (B, n_kv_heads, n_steps * self.step, head_dim)
+            v_shape = (B, n_kv_heads, n_steps * self.step, values.shape[3])
+            new_k = mx.zeros(k_shape, keys.dtype)
+            new_v = mx.zeros(v_shape, values.dtype)
+
+            if self.keys is not None:
+                if prev % self.step != 0:
+                    self.keys = self.keys[..., :prev, :]
+                    self.values = self.values[..., :prev, :]
+                self.keys = mx.concatenate([self.keys, new_k], axis=2)
+                self.values = mx.concatenate([self.values, new_v], axis=2)
+            else:
+                self.keys, self.values = new_k, new_v
+
+        self.offset += keys.shape[2]
+        self.keys[..., prev : self.offset, :] = keys
+        self.values[..., prev : self.offset, :] = values
+
+        return self.keys[..., : self.offset, :], self.values[..., : self.offset, :]
+
 class BaseModel(nn.Module):
     """
     Base class for LLM models.
     """
     def __init__(self, args: ModelArgs):
         super().__init__()
-    
+
     def __call__(self,
                  inputs: mx.array,
                  cache = None
                  ):
         raise NotImplementedError("Class model.Model is used for inheritance only")
+
+    def get_causal_mask(self,
+                        h: mx.array,
+                        cache = None
+                        ) -> mx.array:
+        """
+        Create or reuse an additive causal mask for the input sequence.
+        Masks are only memoized for cached (eager generation) forwards;
+        uncached forwards may run inside a compiled training step, where
+        the mask is built inline so each trace owns it as a constant.
+        Args:
+            h: Input activations.
+            cache: Cache from previous forward pass.
+        Returns:
+            Additive causal mask in the input dtype.
+        """
+        if cache is None:
+            mask = nn.MultiHeadAttention.create_additive_causal_mask(h.shape[1])
+
+            return mask.astype(h.dtype)
+
+        key = (h.shape[1], h.dtype)
+        mask = _causal_mask_cache.get(key)
+        if mask is None:
+            mask = nn.MultiHeadAttention.create_additive_causal_mask(h.shape[1])
+            mask = mask.astype(h.dtype)
+
+            # Keep the cache bounded for long-running servers with varying prompt lengths
+            if len(_causal_mask_cache) >= 16:
+                _causal_mask_cache.clear()
+            _causal_mask_cache[key] = mask
+
+        return mask
+
+    def preprocess_weights(self,
+                           weights: dict
+                           ) -> dict:
+        """
+        Transform checkpoint weights into the model's internal representation.
+        Args:
+            weights: Weights loaded from checkpoint.
+        Returns:
+            Transformed weights.
+        """
+        return weights
+
+    def postprocess_weights(self,
+                            weights: dict
+                            ) -> dict:
+        """
+        Transform internal weights back into checkpoint representation.
+        Args:
+            weights: Model weights.
+        Returns:
+            Transformed weights.
+        """
+        return weights
     
     def loss(self,
         inputs: mx.array,
@@ -1,9 +1,9 @@
-from typing import Optional, Tuple
+from typing import Optional
 
 import mlx.core as mx
 import mlx.nn as nn
 
-from sillm.models.base import BaseModel
+from sillm.models.base import BaseModel, KVCache
 from sillm.models.args import ModelArgs
 import sillm.models.llama as llama
 
@@ -49,7 +49,7 @@ class Attention(nn.Module):
     def __call__(self,
                  x: mx.array,
                  mask: Optional[mx.array] = None,
-                 cache: Optional[Tuple[mx.array, mx.array]] = None,
+                 cache: Optional[KVCache] = None,
                  ) -> mx.array:
         B, L, _ = x.shape
 
@@ -65,11 +65,9 @@ class Attention(nn.Module):
         values = values.reshape(B, L, self.n_kv_heads, -1).transpose(0, 2, 1, 3)
 
         if cache is not None:
-            key_cache, value_cache = cache
-            queries = self.rope(queries, offset=key_cache.shape[2])
-            keys = self.rope(keys, offset=key_cache.shape[2])
-            keys = mx.concatenate([key_cache, keys], axis=2)
-            values = mx.concatenate([value_cache, values], axis=2)
+            queries = self.rope(queries, offset=cache.offset)
+            keys = self.rope(keys, offset=cache.offset)
+            keys, values = cache.update_and_fetch(keys, values)
         else:
             queries = self.rope(queries)
             keys = self.rope(keys)
@@ -79,7 +77,7 @@ class Attention(nn.Module):
         )
         output = output.transpose(0, 2, 1, 3).reshape(B, L, -1)
 
-        return self.wo(output), (keys, values)
+        return self.wo(output), cache
 
 class TransformerBlock(nn.Module):
     """
@@ -104,7 +102,7 @@ class TransformerBlock(nn.Module):
             self,
             x: mx.array,
             mask: Optional[mx.array] = None,
-            cache: Optional[Tuple[mx.array, mx.array]] = None,
+            cache: Optional[KVCache] = None,
             ) -> mx.array:
         """
         Args:
@@ -159,8 +157,7 @@ class Model(BaseModel):
 
         mask = None
         if h.shape[1] > 1:
-            mask = nn.MultiHeadAttention.create_additive_causal_mask(h.shape[1])
-            mask = mask.astype(h.dtype)
+            mask = self.get_causal_mask(h, cache)
 
         if cache is None:
             cache = [None] * len(self.layers)
@@ -1,12 +1,33 @@
+from typing import Optional
 from functools import partial
 
 import mlx.core as mx
 import mlx.nn as nn
 
-from sillm.models.base import BaseModel
+from sillm.models.base import BaseModel, KVCache
 from sillm.models.args import ModelArgs
 import sillm.models.llama as llama
 
+# String causal masks for mx.fast.scaled_dot_product_attention require mlx >= 0.22
+_sdpa_string_mask = tuple(int(v) for v in mx.__version__.split(".")[:3]) >= (0, 22, 0)
+
+@partial(mx.compile, shapeless=True)
+def _gelu_gate(gate, x):
+    """
+    Fused GELU gating for the feed-forward module.
+    """
+    return nn.gelu(gate) * x
+
+@partial(mx.compile, shapeless=True)
+def _add_rms_norm(x, residual, weight, eps):
+    """
+    Fused residual add + RMSNorm, returning both the normalized output
+    and the sum for the next residual connection.
+    """
+    h = x + residual
+
+    return mx.fast.rms_norm(h, weight, eps), h
+
 
 class RMSNorm(nn.Module):
     """
@@ -21,7 +42,7 @@ class RMSNorm(nn.Module):
         self.eps = eps
 
     def __call__(self, x):
-        return mx.fast.rms_norm(x, 1.0 + self.weight, self.eps)
+        return mx.fast.rms_norm(x, self.weight, self.eps)
     
 class FeedForward(llama.FeedForward):
     """
@@ -34,7 +55,7 @@ class FeedForward(llama.FeedForward):
         Returns:
             Output tensor.
         """
-        return self.w2(nn.gelu(self.w1(x)) * self.w3(x))
+        return self.w2(_gelu_gate(self.w1(x), self.w3(x)))
     
 class TransformerBlock(llama.TransformerBlock):
     """
@@ -56,6 +77,26 @@ class TransformerBlock(llama.TransformerBlock):
         self.attention_norm = RMSNorm(args.dim, eps=args.norm_eps)
         self.ffn_norm = RMSNorm(args.dim, eps=args.norm_eps)
 
+    def forward(
+            self,
+            x: mx.array,
+            mask: Optional[mx.array] = None,
+            cache: Optional[KVCache] = None,
+            ) -> mx.array:
+        """
+        Args:
+            x: Input tensor.
+            mask: Mask tensor.
+            cache: Cache from previous forward pass.
+        Returns:
+            Output tensor and cache.
+        """
+        r, cache = self.attention(self.attention_norm(x), mask, cache)
+        y, h = _add_rms_norm(x, r, self.ffn_norm.weight, self.ffn_norm.eps)
+        out = h + self.feed_forward(y)
+
+        return out, cache
+
 ########
 # References:
 # https://github.com/huggingface/transformers/blob/main/src/transformers/models/gemma/modeling_gemma.py
@@ -79,6 +120,40 @@ class Model(llama.Model):
         self.layers = [TransformerBlock(args=args) for _ in range(args.n_layers)]
         self.norm = RMSNorm(args.dim, eps=args.norm_eps)
 
+        self._embed_scale = float(args.dim) ** 0.5
+
+    def preprocess_weights(self,
+                           weights: dict
+                           ) -> dict:
+        """
+        Fold the Gemma (1 + weight) RMSNorm parameterization into the stored weights.
+        Args:
+            weights: Weights loaded from checkpoint.
+        Returns:
+            Transformed weights.
+        """
+        for key in weights:
+            if key.endswith("norm.weight"):
+                weights[key] = weights[key] + 1.0
+
+        return weights
+
+    def postprocess_weights(self,
+                            weights: dict
+                            ) -> dict:
+        """
+        Restore the Gemma checkpoint RMSNorm parameterization.
+        Args:
+            weights: Model weights.
+        Returns:
+            Transformed weights.
+        """
+        for key in weights:
+            if key.endswith("norm.weight"):
+                weights[key] = weights[key] - 1.0
+
+        return weights
+
     def __call__(self,
                  inputs: mx.array,
                  cache = None
@@ -91,12 +166,14 @@ class Model(llama.Model):
             Output logits and cache.
         """
         h = self.tok_embeddings(inputs)
-        h = h * (self.args.dim**0.5)
+        h = h * self._embed_scale
 
         mask = None
         if h.shape[1] > 1:
-            mask = nn.MultiHeadAttention.create_additive_causal_mask(h.shape[1])
-            mask = mask.astype(h.dtype)
+            if _sdpa_string_mask:
+                mask = "causal"
+            else:
+                mask = self.get_causal_mask(h, cache)
 
         if cache is None:
             cache = [None] * len(self.layers)
@@ -157,10 +157,8 @@ class Model(BaseModel):
         h = self.tok_embeddings(inputs)
 
         mask = None
-        T = h.shape[1]
-        if T > 1:
-            mask = nn.MultiHeadAttention.create_additive_causal_mask(T)
-            mask = mask.astype(h.dtype)
+        if h.shape[1] > 1:
+            mask = self.get_causal_mask(h, cache)
 
         if cache is None:
             cache = [None] * len(self.layers)
@@ -187,10 +185,8 @@ class Model(BaseModel):
         h = self.tok_embeddings(inputs)
 
         mask = None
-        T = h.shape[1]
-        if T > 1:
-            mask = nn.MultiHeadAttention.create_additive_causal_mask(T)
-            mask = mask.astype(h.dtype)
+        if h.shape[1] > 1:
+            mask = self.get_causal_mask(h)
 
         aux_loss = 0.0
         for layer in self.layers:
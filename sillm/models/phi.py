@@ -1,9 +1,9 @@
-from typing import Optional, Tuple
+from typing import Optional
 
 import mlx.core as mx
 import mlx.nn as nn
 
-from sillm.models.base import BaseModel
+from sillm.models.base import BaseModel, KVCache
 from sillm.models.args import ModelArgs
 import sillm.models.llama as llama
 
@@ -39,7 +39,7 @@ class Attention(llama.Attention):
     def __call__(self,
                  x: mx.array,
                  mask: Optional[mx.array] = None,
-                 cache: Optional[Tuple[mx.array, mx.array]] = None,
+                 cache: Optional[KVCache] = None,
                  ) -> mx.array:
         B, L, _ = x.shape
 
@@ -55,11 +55,9 @@ class Attention(llama.Attention):
             values = mx.repeat(values, self.repeats, axis=1)
 
         if cache is not None:
-            key_cache, value_cache = cache
-            queries = self.rope(queries, offset=key_cache.shape[2])
-            keys = self.rope(keys, offset=key_cache.shape[2])
-            keys = mx.concatenate([key_cache, keys], axis=2)
-            values = mx.concatenate([value_cache, values], axis=2)
+            queries = self.rope(queries, offset=cache.offset)
+            keys = self.rope(keys, offset=cache.offset)
+            keys, values = cache.update_and_fetch(keys, values)
         else:
             queries = self.rope(queries)
             keys = self.rope(keys)
@@ -73,7 +71,7 @@ class Attention(llama.Attention):
         scores = mx.softmax(scores.astype(mx.float32), axis=-1).astype(scores.dtype)
         output = (scores @ values).transpose(0, 2, 1, 3).reshape(B, L, -1)
 
-        return self.wo(output), (keys, values)
+        return self.wo(output), cache
 
 class FeedForward(nn.Module):
     """
@@ -123,7 +121,7 @@ class TransformerBlock(nn.Module):
     def forward(self,
                 x: mx.array,
                 mask: Optional[mx.array] = None,
-                cache: Optional[Tuple[mx.array, mx.array]] = None,
+                cache: Optional[KVCache] = None,
                 ) -> mx.array:
         h = self.attention_norm(x)
         attn_h, cache = self.attention(h, mask, cache)
@@ -95,8 +95,7 @@ class Model(llama.Model):
 
         mask = None
         if h.shape[1] > 1:
-            mask = nn.MultiHeadAttention.create_additive_causal_mask(h.shape[1])
-            mask = mask.astype(h.dtype)
+            mask = self.get_causal_mask(h, cache)
 
         if cache is None:
             cache = [None] * len(self.layers)
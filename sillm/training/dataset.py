@@ -8,6 +8,28 @@ import mlx.core as mx
 
 logger = logging.getLogger("sillm")
 
+def _pad_length(lengths,
+                train: bool,
+                bucket: int = 64
+                ):
+    """
+    Calculate the padded sequence length for a batch.
+    During training the length is rounded up to a fixed bucket size so
+    that batch shapes repeat and compiled step functions are reused
+    instead of being recompiled for every new sequence length.
+    Args:
+        lengths: Sequence lengths in the batch.
+        train: Whether batches are used for training.
+        bucket: Bucket size for padded lengths.
+    Returns:
+        Padded sequence length.
+    """
+    length = max(lengths)
+    if train:
+        length = ((length + bucket - 1) // bucket) * bucket
+
+    return length
+
 class Dataset:
     """
     Dataset wrapper.
@@ -96,7 +118,7 @@ class DatasetCompletion(Dataset):
                 lengths = [len(x) for x in batch]
 
                 # Pad to the max length
-                batch_arr = np.full((batch_size, max(lengths)), self.pad_id, np.int32)
+                batch_arr = np.full((batch_size, _pad_length(lengths, train)), self.pad_id, np.int32)
                 for j in range(batch_size):
                     batch_arr[j, : lengths[j]] = batch[j]
                 batch = mx.array(batch_arr)
@@ -181,7 +203,7 @@ class DatasetMessages(Dataset):
 
                 # Pad to the max length
                 lengths = [len(x) for x in batch]
-                batch_arr = np.full((batch_size, max(lengths)), self.pad_id, np.int32)
+                batch_arr = np.full((batch_size, _pad_length(lengths, train)), self.pad_id, np.int32)
                 for j in range(batch_size):
                     batch_arr[j, : lengths[j]] = batch[j]
                 batch = mx.array(batch_arr)
@@ -340,8 +362,8 @@ class DatasetDPO(Dataset):
                 rejected_lengths = [len(x[2]) for x in batch]
 
                 # Pad to the max length
-                chosen = np.full((batch_size, max(chosen_lengths)), self.pad_id, np.int32)
-                rejected = np.full((batch_size, max(rejected_lengths)), self.pad_id, np.int32)
+                chosen = np.full((batch_size, _pad_length(chosen_lengths, train)), self.pad_id, np.int32)
+                rejected = np.full((batch_size, _pad_length(rejected_lengths, train)), self.pad_id, np.int32)
                 for j in range(batch_size):
                     chosen[j, : chosen_lengths[j]] = batch[j][1]
                     rejected[j, : rejected_lengths[j]] = batch[j][2]
@@ -62,6 +62,22 @@ class TrainableDPO(TrainableLoRA):
 
         logger.info(f"Initialized DPO with reference model and loss type {loss_type}")
 
+    def train(self,
+              *args,
+              **kwargs
+              ):
+        """
+        Train model with DPO. See TrainableLoRA.train for arguments.
+        """
+        # Reduced-precision training would cast the policy model while the reference model
+        # keeps its original precision, breaking the compiled step
+        if len(args) > 4 and args[4] is not None:
+            raise ValueError("Reduced-precision training (dtype) is not supported for DPO")
+        if kwargs.get("dtype") is not None:
+            raise ValueError("Reduced-precision training (dtype) is not supported for DPO")
+
+        return super().train(*args, **kwargs)
+
     def comparison(self,
                    prompt: str,
                    temperature: float = 0.0,
@@ -7,6 +7,7 @@ import re
 import json
 
 from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 
 import tqdm
 import numpy as np
@@ -378,17 +379,18 @@ class TrainableLoRA(LLM):
         Returns:
             Average loss.
         """
-        all_losses = []
-        num_tokens = 0
+        loss_sum = mx.array(0.0)
+        num_tokens = mx.array(0)
         for _, batch in zip(
             range(num_batches),
             dataset.iterate_batches(batch_size),
         ):
             losses, _, toks = self.loss(*batch)
-            all_losses.append((losses * toks).item())
-            num_tokens += toks.item()
+            loss_sum = loss_sum + losses * toks
+            num_tokens = num_tokens + toks
+            mx.eval(loss_sum, num_tokens)
 
-        return np.sum(all_losses) / num_tokens
+        return (loss_sum / num_tokens).item()
     
     def loss(self, *args, **kwargs):
         """
@@ -405,8 +407,9 @@ class TrainableLoRA(LLM):
               dataset_validation: Dataset,
               batch_size: int = 4,
               learning_rate: float = 1e-5,
+              dtype: str = None,
               compiled_step: bool = True,
-              grad_checkpoint: bool = False,
+              grad_checkpoint: bool = None,
               epochs: int = 1,
               iterations: int = 0,
               report_steps: int = 10,
@@ -422,6 +425,7 @@ class TrainableLoRA(LLM):
             dataset_validation: Validation dataset.
             batch_size: Batch size.
             learning_rate: Learning rate.
+            dtype: Optional dtype to cast float32 parameters to for training (e.g. "bfloat16").
             epochs: Number of epochs.
             iterations: Number of iterations.
             report_steps: Report every `report_steps` iterations.
@@ -440,15 +444,27 @@ class TrainableLoRA(LLM):
         logger.info(f"Training the model for {epochs} epochs of {iterations} batch iterations with batch size {batch_size}")
         logger.debug(f"Training learning rate: {learning_rate}")
 
+        # Optionally cast float32 parameters down for reduced-precision training
+        if dtype is not None:
+            train_dtype = getattr(mx, dtype)
+            if train_dtype != mx.float32:
+                self.model.apply(lambda p: p.astype(train_dtype) if p.dtype == mx.float32 else p)
+                logger.info(f"Training with parameter dtype {dtype}")
+                logger.warning(f"Parameters are cast in place: optimizer state is created in {dtype} and checkpoints saved after training will be {dtype}")
+
         optimizer = optim.Adam(learning_rate=learning_rate)
 
+        # Enable gradient checkpointing by default for deep models where activation memory dominates
+        if grad_checkpoint is None:
+            grad_checkpoint = len(self.model.layers) >= 16
+
         if grad_checkpoint:
             logger.info(f"Enabled gradient checkpointing")
 
             if not compiled_step:
                 logger.warning(f"Gradient checkpointing requires compiled step function")
                 compiled_step = True
-            
+
             for layer in self.model.layers:
                 layer.forward = nn.utils.checkpoint(layer, layer.forward)
 
@@ -466,12 +482,20 @@ class TrainableLoRA(LLM):
 
                 return loss_value, reward, num_tokens
 
-        # Get system memory
+        # Get system memory and precompute the high-usage watermark in bytes
         system_memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        high_memory_watermark = int(0.9 * system_memory)
 
-        losses = []
-        rewards = None
-        intv_tokens = 0
+        # Accumulate metrics on device and only sync at report boundaries
+        intv_loss = mx.array(0.0)
+        intv_tokens = mx.array(0)
+        intv_steps = 0
+        rewards = []
+
+        # Prefetch batches on a background thread to overlap batch preparation with compute
+        batch_iterator = dataset_training.iterate_batches(batch_size, train=True)
+        prefetch_pool = ThreadPoolExecutor(max_workers=1)
+        batch_future = prefetch_pool.submit(next, batch_iterator)
 
         # Main training loop
         start = time.perf_counter()
@@ -480,7 +504,8 @@ class TrainableLoRA(LLM):
             pbar_iterations = tqdm.tqdm(range(iterations), desc="Iter.", leave=False)
             for iter in pbar_iterations:
                 n = epoch * iterations + iter
-                batch = next(dataset_training.iterate_batches(batch_size, train=True))
+                batch = batch_future.result()
+                batch_future = prefetch_pool.submit(next, batch_iterator)
 
                 if compiled_step:
                     loss_value, reward, num_tokens = step(batch)
@@ -488,41 +513,40 @@ class TrainableLoRA(LLM):
                     (loss_value, reward, num_tokens), grad = loss_value_and_grad(*batch)
                     optimizer.update(self.model, grad)
 
-                mx.eval(loss_value, reward, num_tokens)
-
-                # Record loss and number of tokens
-                losses.append(loss_value.item())
-                intv_tokens += num_tokens.item()
+                # Accumulate loss and number of tokens on device
+                intv_loss = intv_loss + loss_value
+                intv_tokens = intv_tokens + num_tokens
+                intv_steps += 1
+                mx.eval(intv_loss, intv_tokens, reward)
 
                 # Record rewards
                 if reward is not None:
-                    if rewards is None:
-                        rewards = reward
-                    else:
-                        rewards = np.vstack([rewards, reward])
+                    rewards.append(reward)
 
-                # Get peak memory usage
-                peak_memory = mx.metal.get_peak_memory()
-                memory_usage = peak_memory / system_memory
-                if memory_usage > 0.9:
-                    pbar_epochs.write(f"HIGH MEMORY USAGE: {(peak_memory // (1024 ** 2)):,} MB ({memory_usage:.2%} of system memory)")
+                # Get peak memory usage at report boundaries
+                if n == 0 or (n + 1) % report_steps == 0 or (n + 1) % eval_steps == 0:
+                    peak_memory = mx.metal.get_peak_memory()
+                    if peak_memory > high_memory_watermark:
+                        memory_usage = peak_memory / system_memory
+                        pbar_epochs.write(f"HIGH MEMORY USAGE: {(peak_memory // (1024 ** 2)):,} MB ({memory_usage:.2%} of system memory)")
 
                 # Report training loss if needed
                 if (n + 1) % report_steps == 0:
-                    train_loss = np.mean(losses)
+                    train_loss = (intv_loss / intv_steps).item()
                     stop = time.perf_counter()
 
-                    pbar_epochs.write(f"#{n + 1}:\tTraining loss    {train_loss:.3f}\t{float(intv_tokens) / (stop - start):.3f} tok/sec")
-                    if rewards is not None:
-                        pbar_epochs.write(f"#{n + 1}:\tTraining reward  {str(np.mean(rewards, axis=0))}")
-                        rewards = None
+                    pbar_epochs.write(f"#{n + 1}:\tTraining loss    {train_loss:.3f}\t{intv_tokens.item() / (stop - start):.3f} tok/sec")
+                    if len(rewards) > 0:
+                        pbar_epochs.write(f"#{n + 1}:\tTraining reward  {str(np.mean(np.stack(rewards), axis=0))}")
+                        rewards = []
                     pbar_epochs.refresh()
 
                     if report_callback is not None:
                         report_callback(n + 1, train_loss)
                     
-                    losses = []
-                    intv_tokens = 0
+                    intv_loss = mx.array(0.0)
+                    intv_tokens = mx.array(0)
+                    intv_steps = 0
                     start = time.perf_counter()
 
                 # Report validation loss if needed
@@ -531,7 +555,7 @@ class TrainableLoRA(LLM):
                     val_loss = self.evaluate(dataset_validation, batch_size, validation_batches)
                     start = time.perf_counter()
                     pbar_epochs.write(f"#{n + 1}:\tValidation loss  {val_loss:.3f}\t{(start - stop):.3f} sec")
-                    pbar_epochs.write(f"#{n + 1}:\tPeak memory      {(peak_memory // (1024 ** 2)):,} MB ({memory_usage:.2%} of system memory)")
+                    pbar_epochs.write(f"#{n + 1}:\tPeak memory      {(peak_memory // (1024 ** 2)):,} MB ({peak_memory / system_memory:.2%} of system memory)")
 
                     # Eval callback
                     if eval_callback is not None:
@@ -539,4 +563,6 @@ class TrainableLoRA(LLM):
                         if msg:
                             pbar_epochs.write(f"#{n + 1}:\t" + msg)
 
-                    start = time.perf_counter()
\ No newline at end of file
+                    start = time.perf_counter()
+
+        prefetch_pool.shutdown(wait=False)
\ No newline at end of file